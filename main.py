@@ -0,0 +1,99 @@
+"""Bot entry point: answers health checks first, then loads and starts the bot.
+
+    python main.py                       run the bot
+    python main.py --startup-report      print import/init times and exit
+    python main.py --startup-report --budget 1.5
+
+Only the standard library is imported before the health server is up;
+python-telegram-bot, the fetcher stack and the bot are loaded after it.
+"""
+import argparse
+import http.server
+import importlib
+import os
+import sys
+import threading
+import time
+
+
+class HealthHandler(http.server.BaseHTTPRequestHandler):
+    """200 "ok" for any GET/HEAD; nothing else is served"""
+
+    def do_GET(self):
+        body = b"ok\n"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command == "GET":
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        pass  # Render probes constantly
+
+
+def start_http_server() -> http.server.ThreadingHTTPServer:
+    """Health-check server for Render, served from a daemon thread"""
+    port = int(os.getenv("PORT", 10000))
+    httpd = http.server.ThreadingHTTPServer(("", port), HealthHandler)
+    threading.Thread(target=httpd.serve_forever, name="health", daemon=True).start()
+    print(f"Health-check server running on port {port}")
+    return httpd
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python main.py", description="Run the price comparison bot")
+    parser.add_argument("--startup-report", action="store_true", help="Print an import/init time breakdown and exit")
+    parser.add_argument("--budget", type=float, help="With --startup-report: exit 1 if startup takes longer (seconds)")
+    args = parser.parse_args(argv)
+    if args.budget is not None and not args.startup_report:
+        parser.error("--budget needs --startup-report")
+
+    started = time.perf_counter()
+    timings = []
+
+    def step(name: str, fn):
+        t = time.perf_counter()
+        result = fn()
+        timings.append((name, time.perf_counter() - t))
+        return result
+
+    # In webhook mode PORT belongs to the webhook server; a report shouldn't grab it either
+    httpd = None
+    if not os.getenv("BOT_WEBHOOK_URL") and not args.startup_report:
+        httpd = step("health server", start_http_server)
+
+    # Module-level settings are read at import time, so .env has to be loaded first
+    from dotenv import load_dotenv
+    step("load .env", load_dotenv)
+    if httpd is not None and os.getenv("BOT_WEBHOOK_URL"):
+        # Webhook mode was only switched on by .env; hand PORT to the webhook server
+        httpd.shutdown()
+        httpd.server_close()
+    step("import telegram", lambda: importlib.import_module("telegram.ext"))
+    step("import price_fetcher (requests, sqlite)", lambda: importlib.import_module("price_fetcher"))
+    price_bot = step("import price_bot", lambda: importlib.import_module("price_bot"))
+    if args.startup_report:
+        # Building the Application needs a token-shaped string; nothing connects in report mode
+        os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:startup-report")
+    bot = step("PriceBot()", price_bot.PriceBot)
+    total = time.perf_counter() - started
+
+    if not args.startup_report:
+        print(f"Bot initialised in {total:.2f}s")
+        bot.run()
+        return 0
+
+    for name, seconds in timings:
+        print(f"{seconds * 1000:8.1f} ms  {name}")
+    print(f"{total * 1000:8.1f} ms  total")
+    if args.budget is not None and total > args.budget:
+        print(f"Startup took {total:.2f}s, over the {args.budget:g}s budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
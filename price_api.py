@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import json
+import os
+from aiohttp import web
+
+from price_fetcher import STORE_NAMES, PriceFetcher
+
+# Set to serve the API alongside the bot (price_bot.py) on this port
+PRICE_API_PORT = int(os.getenv("PRICE_API_PORT", "0"))
+PRICE_API_MAX_BATCH = int(os.getenv("PRICE_API_MAX_BATCH", "100"))
+PRICE_API_CONCURRENCY = int(os.getenv("PRICE_API_CONCURRENCY", "4"))
+
+
+async def price(fetcher: PriceFetcher, query: str) -> dict:
+    """Same shape as one `python -m price_fetcher batch` line"""
+    results = await asyncio.gather(
+        *(asyncio.to_thread(fetcher.search, store, query) for store in STORE_NAMES)
+    )
+    return {"query": query, "results": [r for r in results if r]}
+
+
+async def search(request: web.Request) -> web.Response:
+    """GET /search?q=<product>"""
+    query = request.query.get("q", "").strip()
+    if not query:
+        raise web.HTTPBadRequest(text="Missing query parameter 'q'")
+    fetcher = request.app["fetcher"]
+    body = json.dumps(await price(fetcher, query), ensure_ascii=False).encode()
+
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    headers = {
+        "ETag": etag,
+        # Clients may reuse the response for as long as our cache would
+        "Cache-Control": f"public, max-age={fetcher.max_age(query)}",
+    }
+    if etag in request.headers.get("If-None-Match", ""):
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=body, content_type="application/json", headers=headers)
+
+
+async def search_batch(request: web.Request) -> web.StreamResponse:
+    """POST /search/batch with {"queries": [...]}; streams NDJSON in completion order"""
+    try:
+        payload = await request.json()
+        queries = payload["queries"]
+    except (ValueError, KeyError, TypeError):
+        queries = None
+    # A bare string would otherwise be priced character by character
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        raise web.HTTPBadRequest(text='Expected JSON body {"queries": ["..."]}')
+    queries = [q.strip() for q in queries if q.strip()]
+    if len(queries) > PRICE_API_MAX_BATCH:
+        raise web.HTTPRequestEntityTooLarge(max_size=PRICE_API_MAX_BATCH, actual_size=len(queries))
+
+    fetcher = request.app["fetcher"]
+    limit = asyncio.Semaphore(PRICE_API_CONCURRENCY)
+
+    async def bounded(query: str) -> dict:
+        async with limit:
+            return await price(fetcher, query)
+
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson", "Cache-Control": "no-store"})
+    await response.prepare(request)
+    tasks = [asyncio.create_task(bounded(q)) for q in queries]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            row = await next_done
+            await response.write((json.dumps(row, ensure_ascii=False) + "\n").encode())
+    finally:
+        # Client went away: don't keep scraping for it
+        for task in tasks:
+            task.cancel()
+    await response.write_eof()
+    return response
+
+
+def create_app(fetcher: PriceFetcher | None = None) -> web.Application:
+    """API app; pass the bot's fetcher to share its connections, cache and coalescing"""
+    app = web.Application()
+    app["fetcher"] = fetcher or PriceFetcher()
+    app.router.add_get("/search", search)
+    app.router.add_post("/search/batch", search_batch)
+    return app
+
+
+async def start_api(fetcher: PriceFetcher, port: int = PRICE_API_PORT) -> web.AppRunner:
+    """Serve the API on the running event loop; call runner.cleanup() to stop"""
+    runner = web.AppRunner(create_app(fetcher))
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", port).start()
+    print(f"Price API running on port {port}")
+    return runner
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), port=PRICE_API_PORT or 8081)
@@ -1,25 +1,273 @@
 import os
+import re
+import json
+import time
 import asyncio
-import threading
-import http.server
-import socketserver
+import itertools
+import secrets
+import signal
+import sys
 from dotenv import load_dotenv
-from telegram import Update, BotCommand, ReplyKeyboardMarkup, MenuButtonCommands
-from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
+from telegram import (
+    Update, BotCommand, ReplyKeyboardMarkup, MenuButtonCommands,
+    InlineQueryResultArticle, InlineQueryResultsButton, InputTextMessageContent, InputMediaPhoto,
+    InlineKeyboardButton, InlineKeyboardMarkup,
+)
+from telegram.error import RetryAfter, TelegramError
+from collections import OrderedDict
+from telegram.ext import (
+    Application, CallbackQueryHandler, CommandHandler, ContextTypes, InlineQueryHandler, MessageHandler, filters,
+)
 from urllib.parse import quote_plus
 
 BOT_WEBHOOK_URL = os.getenv("BOT_WEBHOOK_URL")  # Optional: set to run via webhook instead of polling
+# Seconds of idleness after which store connections are pinged to keep them warm (0 disables)
+KEEPALIVE_INTERVAL = float(os.getenv("KEEPALIVE_INTERVAL", "45"))
+# Inline mode: wait this long for the user to stop typing before answering
+INLINE_DEBOUNCE = float(os.getenv("INLINE_DEBOUNCE", "0.6"))
+INLINE_MIN_CHARS = int(os.getenv("INLINE_MIN_CHARS", "3"))
+INLINE_MAX_REFRESHES = int(os.getenv("INLINE_MAX_REFRESHES", "4"))
+# Seconds between background refreshes of popular queries (0 disables)
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "60"))
+# "photo" sends product images as Telegram photos (reusing file_ids) instead of link previews
+REPLY_MODE = os.getenv("REPLY_MODE", "text")
+FILE_ID_CACHE_PATH = os.getenv("FILE_ID_CACHE_PATH", "file_id_cache.json")
+FILE_ID_CACHE_MAX = int(os.getenv("FILE_ID_CACHE_MAX", "5000"))
+CAPTION_LIMIT = 1024  # Telegram's photo caption limit
+# Result cache snapshot, restored in the background at startup ("" disables)
+CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH", "price_cache.jsonl.gz")
+CACHE_SNAPSHOT_INTERVAL = float(os.getenv("CACHE_SNAPSHOT_INTERVAL", "300"))
+# Searches whose results "Details"/"More results" buttons can still refer to
+RESULT_REFS_MAX = int(os.getenv("RESULT_REFS_MAX", "1000"))
+STORE_KEYS = {"Flipkart": "flipkart", "Amazon": "amazon"}
+# Shopping lists (/batch or multi-line messages)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "3"))
+BATCH_EDIT_INTERVAL = float(os.getenv("BATCH_EDIT_INTERVAL", "2"))  # min seconds between progress edits
+# Seconds in-flight searches get to finish after SIGTERM before partial results are sent
+DRAIN_DEADLINE = float(os.getenv("DRAIN_DEADLINE", "20"))
+# Outbound pacing: Telegram allows ~30 messages/sec overall and ~1/sec per chat
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))
+SEND_CHAT_BURST = float(os.getenv("SEND_CHAT_BURST", "3"))
+SEND_MAX_RETRIES = 5
+SEND_CHAT_SWEEP = 60.0  # seconds between drops of idle per-chat buckets
+# Interactive replies jump ahead of background notifications
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+# Telegram user ids allowed to run admin commands like /profile (comma separated)
+ADMIN_IDS = {int(i) for i in os.getenv("ADMIN_IDS", "").split(",") if i.strip()}
+PROFILE_MAX_SECONDS = 300
 # Import our BS4-based fetcher
-from price_fetcher import PriceFetcher
+from price_fetcher import STORE_NAMES, PriceFetcher
 
 
-def start_http_server():
-    """Simple HTTP server for Render health check"""
-    port = int(os.getenv("PORT", 10000))
-    handler = http.server.SimpleHTTPRequestHandler
-    with socketserver.TCPServer(("", port), handler) as httpd:
-        print(f"Health-check server running on port {port}")
-        httpd.serve_forever()
+class FileIdCache:
+    """Image URL -> Telegram file_id, LRU-bounded and saved as JSON.
+
+    Once Telegram has a photo, resending its file_id costs no image bandwidth.
+    """
+
+    def __init__(self, path: str = FILE_ID_CACHE_PATH, max_entries: int = FILE_ID_CACHE_MAX, save_every: float = 30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.save_every = save_every
+        self._entries = OrderedDict()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        try:
+            with open(path, encoding="utf-8") as f:
+                # Stored oldest first so the LRU order survives restarts
+                self._entries.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not load file_id cache {path}: {e}")
+
+    def get(self, url: str) -> str | None:
+        file_id = self._entries.get(url)
+        if file_id:
+            self._entries.move_to_end(url)
+        return file_id
+
+    def put(self, url: str, file_id: str):
+        self._entries[url] = file_id
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= self.save_every:
+            self.save()
+
+    def discard(self, url: str):
+        if self._entries.pop(url, None):
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        except OSError as e:
+            print(f"Warning: Could not save file_id cache {self.path}: {e}")
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is)"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+        return max(wait, self.paused_until - now)
+
+    def take(self):
+        self.tokens -= 1.0
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def full(self) -> bool:
+        """Refilled to burst with no pause left, i.e. no different from a new bucket"""
+        return self.delay() == 0 and self.tokens >= self.burst
+
+
+class SendQueue:
+    """Outbound Telegram calls paced by a global and a per-chat token bucket.
+
+    Calls are queued as zero-argument coroutine factories, served in priority
+    order, and retried after Telegram's RetryAfter wait. Chats that are over
+    their own limit are set aside, so they don't hold up other chats.
+    """
+
+    def __init__(self, global_rate: float = SEND_GLOBAL_RATE, chat_rate: float = SEND_CHAT_RATE,
+                 chat_burst: float = SEND_CHAT_BURST):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats = {}  # chat_id -> TokenBucket, dropped again once full
+        self._swept_at = time.monotonic()
+        self._queue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._worker = None
+        self._in_flight = set()
+        # Calls not yet answered, including ones parked until their chat has a token
+        self._pending = 0
+        # Queue wait metrics (enqueue -> first send attempt)
+        self.sent = 0
+        self.retried = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def send(self, chat_id, make_call, priority: int = PRIORITY_INTERACTIVE):
+        """Queue make_call() for chat_id and return its result once sent"""
+        future = asyncio.get_running_loop().create_future()
+        self._put([priority, next(self._seq), chat_id, make_call, future, time.monotonic(), 0])
+        self._pending += 1
+        try:
+            return await future
+        finally:
+            self._pending -= 1
+
+    def _put(self, item: list):
+        self._queue.put_nowait((item[0], item[1], item))
+
+    async def join(self, timeout: float):
+        """Wait until everything queued has been sent, or the timeout passes"""
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "queued": self._pending,
+            "avg_wait": self.wait_total / self.sent if self.sent else 0.0,
+            "max_wait": self.wait_max,
+        }
+
+    def _chat(self, chat_id) -> TokenBucket:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return chat
+
+    def _sweep(self):
+        """Drop the buckets of chats that have gone quiet; they'd be recreated identical"""
+        now = time.monotonic()
+        if now - self._swept_at < SEND_CHAT_SWEEP:
+            return
+        self._swept_at = now
+        for chat_id in [c for c, bucket in self._chats.items() if bucket.full()]:
+            del self._chats[chat_id]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, item = await self._queue.get()
+            self._sweep()
+            chat = self._chat(item[2])
+            chat_wait = chat.delay()
+            if chat_wait > 0:
+                # Re-queue once this chat has a token; keep serving others meanwhile
+                loop.call_later(chat_wait, self._put, item)
+                continue
+            global_wait = self._global.delay()
+            while global_wait > 0:
+                await asyncio.sleep(global_wait)
+                global_wait = self._global.delay()
+            chat.take()
+            self._global.take()
+            task = asyncio.create_task(self._deliver(item))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _deliver(self, item: list):
+        _, _, chat_id, make_call, future, queued_at, attempts = item
+        if future.cancelled():
+            return
+        if attempts == 0:
+            waited = time.monotonic() - queued_at
+            self.sent += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        try:
+            result = await make_call()
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+            if attempts >= SEND_MAX_RETRIES:
+                future.set_exception(e)
+                return
+            print(f"Flood control for chat {chat_id}: retrying in {retry_after}s")
+            self.retried += 1
+            # We can't tell a chat limit from the global one, so back off both
+            self._chat(chat_id).pause(retry_after)
+            self._global.pause(retry_after)
+            item[6] = attempts + 1
+            self._put(item)
+        except Exception as e:
+            if not future.cancelled():
+                future.set_exception(e)
+        else:
+            if not future.cancelled():
+                future.set_result(result)
 
 
 class PriceBot:
@@ -30,112 +278,570 @@ class PriceBot:
 
         # Our price fetcher instance
         self.fetcher = PriceFetcher()
+        self.file_ids = FileIdCache()
+        # Every reply goes through here to stay inside Telegram's rate limits
+        self.send_queue = SendQueue()
+        # Button token -> {"product_name", "results": {store: top results}}, oldest evicted first
+        self._result_refs = OrderedDict()
+        # update_id -> in-flight search state, for graceful shutdown
+        self._searches = {}
+        self._draining = False
 
         # Register bot commands
         self.setup_commands = [
             BotCommand("start", "Greet & show instructions"),
             BotCommand("help", "How to use the bot"),
+            BotCommand("batch", "Compare a shopping list (one product per line)"),
         ]
 
-        # Handlers
+        # Inline mode state: latest inline query id per user, queries being refreshed
+        self._inline_latest = {}
+        self._refreshing = {}  # lower-cased query -> refresh task
+
+        # Handlers (searches and inline queries don't block other updates)
         self.application.add_handler(CommandHandler("start", self.start))
         self.application.add_handler(CommandHandler("help", self.help))
+        self.application.add_handler(CommandHandler("batch", self.batch, block=False))
+        # Admin-only and deliberately not in setup_commands
+        self.application.add_handler(CommandHandler("profile", self.profile, block=False))
         self.application.add_handler(
-            MessageHandler(filters.TEXT & ~filters.COMMAND, self.search_product)
+            MessageHandler(filters.TEXT & ~filters.COMMAND, self.search_product, block=False)
         )
+        self.application.add_handler(InlineQueryHandler(self.inline_query, block=False))
+        self.application.add_handler(CallbackQueryHandler(self.on_button, block=False))
 
-        # Post init
+        # Post init / shutdown
         self.application.post_init = self.post_init
+        self.application.post_shutdown = self.post_shutdown
 
     async def post_init(self, application):
+        self.send_queue.start()
+        # We handle SIGTERM ourselves (run_* get stop_signals=None) to drain with a deadline
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, lambda: asyncio.ensure_future(self.drain_and_stop()))
+            except (NotImplementedError, RuntimeError) as e:
+                print(f"Warning: Could not install {sig.name} handler: {e}")
+        if CACHE_SNAPSHOT_PATH:
+            # Restore off the critical path; live results that land first are kept
+            self._snapshot_task = asyncio.create_task(self.snapshot_cache())
         try:
             await application.bot.set_my_commands(self.setup_commands)
             await application.bot.set_chat_menu_button(menu_button=MenuButtonCommands())
         except Exception as e:
             print(f"Warning: Could not set up bot commands/menu: {e}")
 
+        # Pay DNS + TLS to the stores now rather than on the first user's search,
+        # without holding up polling if a store host is slow
+        self._warmup_task = asyncio.create_task(self.warm_up_stores())
+        if KEEPALIVE_INTERVAL > 0:
+            self._keepalive_task = asyncio.create_task(self.keep_connections_warm())
+        if PREFETCH_INTERVAL > 0:
+            self._prefetch_task = asyncio.create_task(self.prefetch_popular())
+        # JSON API for non-Telegram consumers, sharing this bot's fetcher and cache
+        if int(os.getenv("PRICE_API_PORT", "0")):
+            # aiohttp is only loaded when the API is enabled
+            from price_api import PRICE_API_PORT, start_api
+            self._api_runner = await start_api(self.fetcher, PRICE_API_PORT)
+
+    async def post_shutdown(self, application):
+        self.file_ids.save()
+        if CACHE_SNAPSHOT_PATH:
+            await asyncio.to_thread(self.save_cache_snapshot)
+        print(f"Send queue: {self.send_queue.stats()}")
+        print(f"Page parses: {self.fetcher.fingerprints.stats()}")
+        if hasattr(self.fetcher.session, "stats"):
+            print(f"HTTP transport: {self.fetcher.session.stats()}")
+
+    async def reply(self, update: Update, make_call, priority: int = PRIORITY_INTERACTIVE):
+        """Send a reply through the rate-limited queue; make_call returns the Bot API coroutine"""
+        return await self.send_queue.send(update.effective_chat.id, make_call, priority)
+
+    async def drain_and_stop(self):
+        """Stop taking updates, let searches finish within DRAIN_DEADLINE, then stop the bot.
+
+        Searches still running at the deadline get a reply with whatever
+        stores have answered so far. Queued replies, the file_id cache and
+        the cache snapshot are flushed before the application stops.
+        """
+        if self._draining:
+            return
+        self._draining = True
+        deadline = time.monotonic() + DRAIN_DEADLINE
+        print(f"Shutdown requested: draining {len(self._searches)} in-flight search(es)")
+        updater = self.application.updater
+        if updater and updater.running:
+            await updater.stop()
+
+        pending = [s["task"] for s in self._searches.values()]
+        if pending:
+            await asyncio.wait(pending, timeout=max(0.0, deadline - time.monotonic()))
+        for search in list(self._searches.values()):
+            if search["replying"]:
+                continue
+            search["task"].cancel()
+            await search.get("on_deadline", self.reply_partial)(search)
+
+        await self.send_queue.join(max(1.0, deadline - time.monotonic()))
+        self.file_ids.save()
+        if CACHE_SNAPSHOT_PATH:
+            await asyncio.to_thread(self.save_cache_snapshot)
+        self.application.stop_running()
+
+    async def reply_partial(self, search: dict):
+        update = search["update"]
+        response = f"⚠️ *The bot is restarting.* Partial results for: {search['product_name']}\n\n"
+        for store, icon in (("Flipkart", "🛒"), ("Amazon", "📦")):
+            if store in search["partial"]:
+                result, url = search["partial"][store]
+                response += f"{icon} *{store}*: {self.format_result(result, url)}\n"
+            else:
+                response += f"{icon} *{store}*: still searching\n"
+        response += "\n_Please send your search again in a minute for complete results._"
+        try:
+            await self.reply(update, lambda: update.message.reply_text(response, parse_mode="Markdown"))
+        except TelegramError as e:
+            print(f"Could not send partial results: {e}")
+
+    def save_cache_snapshot(self):
+        try:
+            saved = self.fetcher.cache.save_snapshot(CACHE_SNAPSHOT_PATH)
+            print(f"Saved {saved} cached results to {CACHE_SNAPSHOT_PATH}")
+        except OSError as e:
+            print(f"Warning: Could not save cache snapshot: {e}")
+
+    async def snapshot_cache(self):
+        """Warm the cache from the last snapshot, then snapshot it periodically"""
+        loaded = await asyncio.to_thread(self.fetcher.cache.load_snapshot, CACHE_SNAPSHOT_PATH)
+        print(f"Restored {loaded} cached results from {CACHE_SNAPSHOT_PATH}")
+        while True:
+            await asyncio.sleep(CACHE_SNAPSHOT_INTERVAL)
+            await asyncio.to_thread(self.save_cache_snapshot)
+
+    async def warm_up_stores(self):
+        warmed = await asyncio.to_thread(self.fetcher.warm_up)
+        print(f"Pre-connected to {warmed} store host(s)")
+
+    async def keep_connections_warm(self):
+        """Ping store hosts while idle so pooled connections don't go cold"""
+        while True:
+            await asyncio.sleep(KEEPALIVE_INTERVAL)
+            if self.fetcher.idle_for() >= KEEPALIVE_INTERVAL:
+                await asyncio.to_thread(self.fetcher.warm_up)
+
+    async def prefetch_popular(self):
+        """Refresh hot queries before they expire so users hit a warm cache"""
+        while True:
+            await asyncio.sleep(PREFETCH_INTERVAL)
+            try:
+                refreshed = await asyncio.to_thread(self.fetcher.prefetch_once)
+                if refreshed:
+                    print(f"Prefetched {refreshed} popular queries")
+            except Exception as e:
+                print(f"Prefetch failed: {e}")
+
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start command"""
         user_first_name = update.effective_user.first_name or "there"
         keyboard = ReplyKeyboardMarkup([["/help"]], resize_keyboard=True)
-        await update.message.reply_text(
+        await self.reply(update, lambda: update.message.reply_text(
             f"Hi {user_first_name}! I am your Price Comparison Bot.\n"
             "Send me a product name to compare prices across Amazon & Flipkart.\n"
             "Example: iPhone 13",
             reply_markup=keyboard,
-        )
+        ))
 
     async def help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Help instructions"""
-        await update.message.reply_text(
+        await self.reply(update, lambda: update.message.reply_text(
             "To use this bot:\n"
             "1. Send a product name\n"
             "2. I'll search Amazon and Flipkart\n"
             "3. I'll send you the price comparison\n\n"
-            "Example: iPhone 13"
-        )
+            "Example: iPhone 13\n\n"
+            "Shopping for several things? Send /batch followed by one product per line, "
+            "or just send the list as one message."
+        ))
 
     async def search_product(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Search product on Amazon & Flipkart"""
         product_name = update.message.text
 
+        # A multi-line message is a shopping list
+        items = self.parse_shopping_list(product_name)
+        if "\n" in product_name.strip() and len(items) > 1:
+            await self.run_shopping_list(update, items)
+            return
+
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
 
+        # Tracked so a shutdown can wait for it or answer with partial results
+        search = {
+            "update": update,
+            "product_name": product_name,
+            "partial": {},
+            "replying": False,
+            "task": asyncio.current_task(),
+        }
+        self._searches[update.update_id] = search
+        try:
+            await self.answer_search(update, search)
+        finally:
+            self._searches.pop(update.update_id, None)
+
+    async def batch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/batch: compare several products in one reply"""
+        parts = update.message.text.split(None, 1)
+        items = self.parse_shopping_list(parts[1] if len(parts) > 1 else "")
+        if not items:
+            await self.reply(update, lambda: update.message.reply_text(
+                "Send /batch followed by one product per line, e.g.\n/batch\niPhone 13\nboAt Airdopes 141"
+            ))
+            return
+        await self.run_shopping_list(update, items)
+
+    async def profile(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/profile [seconds]: sample where search time goes for a while (admins only)"""
+        if update.effective_user is None or update.effective_user.id not in ADMIN_IDS:
+            return
+        try:
+            seconds = min(float(context.args[0]), PROFILE_MAX_SECONDS) if context.args else 30.0
+        except ValueError:
+            seconds = 30.0
+        await self.reply(update, lambda: update.message.reply_text(
+            f"Profiling searches for {seconds:g}s..."
+        ))
+        profiler = self.fetcher.profiler
+        profiler.start("admin")
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            report = await asyncio.to_thread(profiler.stop)
+        if report is None:
+            text = "Other profiled searches are still running; the profile is written when they finish."
+        elif not report["path"]:
+            text = f"No search ran during the {report['seconds']}s window ({report['samples']} samples)."
+        else:
+            lines = [f"{n:>5}  {leaf}" for leaf, n in report["top"]]
+            text = (
+                f"{report['samples']} samples over {report['seconds']}s, saved to {report['path']}\n"
+                "Hottest leaf frames:\n" + "\n".join(lines)
+            )
+        await self.reply(update, lambda: update.message.reply_text(text))
+
+    @staticmethod
+    def parse_shopping_list(text: str) -> list:
+        """Products from a list: one per line (or ';'), bullets and numbering stripped, duplicates dropped"""
+        items = []
+        seen = set()
+        for line in re.split(r"[\n;]+", text):
+            item = re.sub(r"^\s*(?:[-*•]|\d+[.)](?=\s))\s*", "", line).strip()
+            if item and item.lower() not in seen:
+                seen.add(item.lower())
+                items.append(item)
+        return items
+
+    @staticmethod
+    def parse_price(price: str | None) -> int | None:
+        digits = re.sub(r"[^\d]", "", (price or "").split(".")[0])
+        return int(digits) if digits else None
+
+    def render_shopping_list(self, items: list, rows: dict, note: str = "") -> str:
+        done = sum(1 for r in rows.values() if r is not None)
+        text = f"🛍 *Shopping list* ({done}/{len(items)} compared)\n"
+        total = 0
+        unpriced = 0
+        for i, item in enumerate(items):
+            text += f"\n{i + 1}. *{item}*"
+            if rows.get(i) is None:
+                text += " ⏳\n"
+                continue
+            text += "\n"
+            prices = {store: self.parse_price(result["price"]) if result else None for store, result, _ in rows[i]}
+            known = [p for p in prices.values() if p]
+            best = min(known) if known else None
+            if best:
+                total += best
+            else:
+                unpriced += 1
+            for (store, result, _), icon in zip(rows[i], ("🛒", "📦")):
+                cheapest = " ✅" if best and prices[store] == best and len(known) > 1 else ""
+                text += f"   {icon} {store}: {result['price'] if result else 'n/a'}{cheapest}\n"
+        if done == len(items) and total:
+            # Items without a price aren't in the sum; say so rather than understate the list
+            missing = f" _(excl. {unpriced} item{'s' if unpriced > 1 else ''} without a price)_" if unpriced else ""
+            text += f"\n💰 *Cheapest total*: ₹{total:,}{missing}\n"
+        return text + note
+
+    async def run_shopping_list(self, update: Update, items: list):
+        """Fan a list out over both stores with bounded concurrency, editing one reply as results land"""
+        note = ""
+        if len(items) > BATCH_MAX_ITEMS:
+            note = f"\n_Only the first {BATCH_MAX_ITEMS} products were compared._"
+            items = items[:BATCH_MAX_ITEMS]
+        rows = {}
+        message = await self.reply(update, lambda: update.message.reply_text(
+            self.render_shopping_list(items, rows), parse_mode="Markdown"
+        ))
+
+        async def edit(priority: int, extra: str = ""):
+            async def call():
+                # Rendered at send time, so a late progress edit never shows older data
+                try:
+                    return await message.edit_text(self.render_shopping_list(items, rows, note + extra), parse_mode="Markdown")
+                except TelegramError as e:
+                    if "not modified" not in str(e).lower():
+                        raise
+            try:
+                await self.reply(update, call, priority)
+            except TelegramError as e:
+                print(f"Could not update shopping list: {e}")
+
+        async def on_deadline(state: dict):
+            await edit(PRIORITY_INTERACTIVE, "\n⚠️ _The bot is restarting. Send the list again for the missing items._")
+
+        state = {
+            "update": update,
+            "product_name": f"{len(items)} products",
+            "partial": {},
+            "replying": False,
+            "task": asyncio.current_task(),
+            "on_deadline": on_deadline,
+        }
+        self._searches[update.update_id] = state
+        limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+        last_edit = time.monotonic()
+
+        async def compare(i: int, item: str):
+            nonlocal last_edit
+            async with limit:
+                rows[i] = await self.lookup(item)
+            if time.monotonic() - last_edit >= BATCH_EDIT_INTERVAL:
+                last_edit = time.monotonic()
+                await edit(PRIORITY_BACKGROUND)
+
+        try:
+            await asyncio.gather(*(compare(i, item) for i, item in enumerate(items)))
+            state["replying"] = True
+            await edit(PRIORITY_INTERACTIVE)
+        finally:
+            self._searches.pop(update.update_id, None)
+
+    async def answer_search(self, update: Update, search: dict):
+        product_name = search["product_name"]
         # Search in parallel with asyncio
-        flipkart_result, amazon_result = await asyncio.gather(
-            self.get_flipkart_price(product_name), self.get_amazon_price(product_name)
-        )
+        rows = await self.lookup(product_name, search["partial"])
+        search["replying"] = True
+        images = [r["image_url"] for _, r, _ in rows if r and r.get("image_url")]
 
-        response = f"🔍 *Price Comparison for: {product_name}*\n\n"
+        def render(with_image: bool) -> str:
+            response = f"🔍 *Price Comparison for: {product_name}*\n\n"
+            for (store, result, url), icon in zip(rows, ("🛒", "📦")):
+                response += f"{icon} *{store}*: {self.format_result(result, url, with_image=with_image)}\n"
+            # Note
+            return response + "\n_Note: Results may vary, prices are live._"
 
-        response += f"🛒 *Flipkart*: {flipkart_result}\n"
-        response += f"📦 *Amazon*: {amazon_result}\n"
+        keyboard = self.result_keyboard(product_name, rows)
+        if REPLY_MODE == "photo" and images and await self.reply_with_photos(update, render(False), images, keyboard):
+            return
+        # Text replies (including the fallback when photos fail) carry the image links
+        response = render(True)
+        await self.reply(update, lambda: update.message.reply_text(response, parse_mode="Markdown", reply_markup=keyboard))
 
-        # Note
-        response += "\n_Note: Results may vary, prices are live._"
+    def result_keyboard(self, product_name: str, rows: list) -> InlineKeyboardMarkup | None:
+        """Details / More results buttons pointing at this search's cached top results"""
+        results = {
+            STORE_KEYS[store]: result["top_results"]
+            for store, result, _ in rows if result and result.get("top_results")
+        }
+        if not results:
+            return None
+        token = secrets.token_urlsafe(6)
+        self._result_refs[token] = {"product_name": product_name, "results": results}
+        while len(self._result_refs) > RESULT_REFS_MAX:
+            self._result_refs.popitem(last=False)
+        details = [
+            InlineKeyboardButton(f"{STORE_NAMES[store]} details", callback_data=f"d:{token}:{store}:0")
+            for store in results
+        ]
+        return InlineKeyboardMarkup([details, [InlineKeyboardButton("More results", callback_data=f"m:{token}")]])
 
-        await update.message.reply_text(response, parse_mode="Markdown")
+    async def on_button(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Details / More results: product pages are only fetched when a button is tapped"""
+        query = update.callback_query
+        kind, token, *rest = query.data.split(":")
+        ref = self._result_refs.get(token)
+        if ref is None:
+            await query.answer("This search has expired, please search again.", show_alert=True)
+            return
 
-    async def get_flipkart_price(self, product_name: str) -> str:
-        url = f"https://www.flipkart.com/search?q={quote_plus(product_name)}"
-        result = self.fetcher.search_flipkart(product_name)
-        if result:
-            img = f"\n[Image]({result['image_url']})" if result.get('image_url') else ""
-            return f"{result['product_name']} - {result['price']} (Link: {url}){img}"
-        return f"Not available (Link: {url})"
+        if kind == "m":
+            await query.answer()
+            text = f"🔍 *More results for: {ref['product_name']}*\n"
+            buttons = []
+            for store, items in ref["results"].items():
+                text += f"\n*{STORE_NAMES[store]}*\n"
+                for i, item in enumerate(items):
+                    text += f"{i + 1}. {item['product_name']} - {item['price'] or 'price n/a'}\n"
+                    buttons.append(InlineKeyboardButton(f"{STORE_NAMES[store]} #{i + 1}", callback_data=f"d:{token}:{store}:{i}"))
+            keyboard = InlineKeyboardMarkup([buttons[i:i + 3] for i in range(0, len(buttons), 3)])
+            await self.reply(update, lambda: query.message.reply_text(
+                text, parse_mode="Markdown", reply_markup=keyboard, disable_web_page_preview=True
+            ))
+            return
 
-    async def get_amazon_price(self, product_name: str) -> str:
-        url = f"https://www.amazon.in/s?k={quote_plus(product_name)}"
-        result = self.fetcher.search_amazon(product_name)
+        store, index = rest[0], int(rest[1])
+        items = ref["results"].get(store) or []
+        if index >= len(items):
+            await query.answer("That result is no longer available.", show_alert=True)
+            return
+        item = items[index]
+        await query.answer("Fetching product details...")
+        details = await asyncio.to_thread(self.fetcher.fetch_details, store, item["url"])
+        text = f"📄 *{STORE_NAMES[store]}*: {item['product_name']}\n"
+        if details:
+            text += f"💰 Price: {details.get('price') or item['price']}\n"
+            for label, field in (("🏷 Variant", "variant"), ("🏪 Seller", "seller"), ("🚚 Delivery", "delivery")):
+                if details.get(field):
+                    text += f"{label}: {details[field]}\n"
+            for offer in details.get("offers", []):
+                text += f"🎁 {offer}\n"
+        else:
+            text += f"💰 Price: {item['price']}\n_Couldn't load more details right now._\n"
+        text += f"(Link: {item['url']})"
+        await self.reply(update, lambda: query.message.reply_text(text, parse_mode="Markdown"))
+
+    async def reply_with_photos(self, update: Update, caption: str, image_urls: list, keyboard=None) -> bool:
+        """Send product images as photos, by cached file_id when we have one; False if it didn't work"""
+        if len(caption) > CAPTION_LIMIT:
+            return False
+        media = [self.file_ids.get(url) or url for url in image_urls]
+        try:
+            if len(media) == 1:
+                messages = [await self.reply(update, lambda: update.message.reply_photo(
+                    media[0], caption=caption, parse_mode="Markdown", reply_markup=keyboard
+                ))]
+            else:
+                messages = await self.reply(update, lambda: update.message.reply_media_group([
+                    InputMediaPhoto(m, caption=caption if i == 0 else None, parse_mode="Markdown")
+                    for i, m in enumerate(media)
+                ]))
+        except TelegramError as e:
+            # A stale file_id or an image Telegram can't fetch; forget file_ids and reply as text
+            print(f"Photo reply failed: {e}")
+            for url in image_urls:
+                self.file_ids.discard(url)
+            return False
+        for url, message in zip(image_urls, messages):
+            if message.photo:
+                self.file_ids.put(url, message.photo[-1].file_id)
+        return True
+
+    @staticmethod
+    def format_result(result: dict | None, url: str, with_image: bool = True) -> str:
         if result:
-            img = f"\n[Image]({result['image_url']})" if result.get('image_url') else ""
+            img = f"\n[Image]({result['image_url']})" if with_image and result.get('image_url') else ""
             return f"{result['product_name']} - {result['price']} (Link: {url}){img}"
         return f"Not available (Link: {url})"
 
-    async def run_webhook(self):
+    async def lookup(self, product_name: str, partial: dict | None = None) -> list:
+        """(store, result or None, search URL) for Flipkart and Amazon, searched concurrently.
+
+        Each store's (result, url) is also put in `partial` as soon as it arrives.
+        """
+        async def one(store: str, search, url: str):
+            result = await asyncio.to_thread(search, product_name)
+            if partial is not None:
+                partial[store] = (result, url)
+            return store, result, url
+
+        return list(await asyncio.gather(
+            one("Flipkart", self.fetcher.search_flipkart, f"https://www.flipkart.com/search?q={quote_plus(product_name)}"),
+            one("Amazon", self.fetcher.search_amazon, f"https://www.amazon.in/s?k={quote_plus(product_name)}"),
+        ))
+
+    async def inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Answer `@bot <product>` from cached results only; misses are refreshed in the background"""
+        inline = update.inline_query
+        product_name = inline.query.strip()
+        if len(product_name) < INLINE_MIN_CHARS:
+            return
+
+        # Debounce keystrokes: only the user's latest query gets an answer
+        user_id = inline.from_user.id
+        self._inline_latest[user_id] = inline.id
+        await asyncio.sleep(INLINE_DEBOUNCE)
+        if self._inline_latest.get(user_id) != inline.id:
+            return
+        del self._inline_latest[user_id]
+
+        flipkart = self.fetcher.peek("flipkart", product_name)
+        amazon = self.fetcher.peek("amazon", product_name)
+        if not flipkart or not amazon:
+            self.refresh_in_background(product_name)
+        if not flipkart and not amazon:
+            await inline.answer(
+                [],
+                cache_time=0,
+                button=InlineQueryResultsButton(text=f"Fetching prices for {product_name[:40]}...", start_parameter="inline"),
+            )
+            return
+
+        flipkart_url = f"https://www.flipkart.com/search?q={quote_plus(product_name)}"
+        amazon_url = f"https://www.amazon.in/s?k={quote_plus(product_name)}"
+        response = f"🔍 *Price Comparison for: {product_name}*\n\n"
+        response += f"🛒 *Flipkart*: {self.format_result(flipkart, flipkart_url)}\n"
+        response += f"📦 *Amazon*: {self.format_result(amazon, amazon_url)}\n"
+        description = " | ".join(f"{r['store']}: {r['price']}" for r in (flipkart, amazon) if r)
+        thumbnail = next((r["image_url"] for r in (flipkart, amazon) if r and r.get("image_url")), None)
+        article = InlineQueryResultArticle(
+            id="compare",
+            title=f"Compare prices: {product_name}",
+            description=description,
+            thumbnail_url=thumbnail,
+            input_message_content=InputTextMessageContent(response, parse_mode="Markdown"),
+        )
+        await inline.answer([article], cache_time=60)
+
+    def refresh_in_background(self, product_name: str):
+        """Scrape a query off the critical path so the next lookup hits the cache"""
+        key = product_name.lower()
+        if key in self._refreshing or len(self._refreshing) >= INLINE_MAX_REFRESHES:
+            return
+
+        async def refresh():
+            try:
+                await asyncio.to_thread(self.fetcher.search_all, product_name)
+            except Exception as e:
+                print(f"Background refresh failed for {product_name}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    def run_webhook(self):
         # Run as webhook if BOT_WEBHOOK_URL is provided
         port = int(os.getenv("PORT", 8080))
         url_path = self.token
-        await self.application.start()
-        await self.application.bot.set_webhook(url=f"{BOT_WEBHOOK_URL}/{url_path}")
-        await self.application.updater.start_webhook(
+        self.application.run_webhook(
             listen="0.0.0.0",
             port=port,
             url_path=url_path,
             webhook_url=f"{BOT_WEBHOOK_URL}/{url_path}",
+            allowed_updates=Update.ALL_TYPES,
+            stop_signals=None,
         )
-        await self.application.updater.idle()
 
     def run(self):
+        # Signals are handled in post_init so shutdown can drain in-flight searches
         if BOT_WEBHOOK_URL:
-            asyncio.run(self.run_webhook())
+            self.run_webhook()
         else:
-            self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+            self.application.run_polling(allowed_updates=Update.ALL_TYPES, stop_signals=None)
 
 
 if __name__ == "__main__":
-    # Start health check server
-    threading.Thread(target=start_http_server, daemon=True).start()
-
-    bot = PriceBot()
-    bot.run()
+    # main.py starts the health check server and the bot
+    from main import main
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import parse_qs, quote_plus, urlencode, urlsplit, urlunsplit
+
+from price_fetcher import (
+    PRODUCT_INDEX_PATH, STORE_RATE_LIMIT, HostRateLimiter, PriceFetcher, build_headers, product_key,
+)
+from result_cache import ProductIndex
+
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "20"))
+CRAWL_STATE_PATH = os.getenv("CRAWL_STATE_PATH", "crawl_state.json")
+# Listing pages show up to ~40 (Flipkart) / ~60 (Amazon) cards; keep all of them
+CRAWL_PAGE_SIZE = 100
+
+
+def store_for(url: str) -> str | None:
+    host = urlsplit(url).hostname or ""
+    if host.endswith("flipkart.com"):
+        return "flipkart"
+    if host.endswith("amazon.in"):
+        return "amazon"
+    return None
+
+
+def page_url(url: str, page: int) -> str:
+    """The listing URL for a page number (both stores paginate with ?page=N)"""
+    parts = urlsplit(url)
+    query = {k: v for k, v in parse_qs(parts.query, keep_blank_values=True).items() if k != "page"}
+    if page > 1:
+        query["page"] = [str(page)]
+    return urlunsplit(parts._replace(query=urlencode(query, doseq=True)))
+
+
+class Crawler:
+    """Paginates store listing/search pages into a ProductIndex.
+
+    The frontier holds (seed URL, page) pairs still to fetch. It is written
+    to state_path after every page, together with the visited pages, so an
+    interrupted crawl resumes where it stopped. The state file is removed
+    once a crawl completes, so the next run starts fresh. A seed stops
+    paginating at max_pages, or at a page with no product this crawl hasn't
+    already indexed.
+    """
+
+    def __init__(self, fetcher: PriceFetcher, index: ProductIndex, state_path: str = CRAWL_STATE_PATH,
+                 concurrency: int = 2, max_pages: int = CRAWL_MAX_PAGES):
+        self.fetcher = fetcher
+        self.index = index
+        self.state_path = state_path
+        self.concurrency = concurrency
+        self.max_pages = max_pages
+        self.frontier = []  # [seed url, page]
+        self.visited = set()  # page URLs already crawled
+        self.seen = set()  # product keys indexed during this crawl
+        if os.path.exists(state_path):
+            with open(state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.frontier = [list(p) for p in state.get("frontier", [])]
+            self.visited = set(state.get("visited", []))
+            self.seen = set(state.get("seen", []))
+            print(f"Resuming crawl: {len(self.frontier)} page(s) queued, {len(self.visited)} done", file=sys.stderr)
+
+    def add_seed(self, url: str):
+        if store_for(url) is None:
+            raise ValueError(f"Not a Flipkart or Amazon URL: {url}")
+        if page_url(url, 1) not in self.visited and [url, 1] not in self.frontier:
+            self.frontier.append([url, 1])
+
+    def _save(self, in_flight):
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                # In-flight pages go back on the frontier in case we're interrupted mid-page
+                "frontier": list(in_flight) + self.frontier,
+                "visited": sorted(self.visited),
+                "seen": sorted(self.seen),
+            }, f)
+        os.replace(tmp, self.state_path)
+
+    def _crawl_page(self, seed: str, page: int):
+        """Fetch one listing page; returns (product keys on it, products new to the index)"""
+        store = store_for(seed)
+        headers = build_headers()
+        if store == "amazon":
+            headers["Accept-Language"] = "en-IN,en;q=0.9"
+        listing = self.fetcher._flipkart_listing if store == "flipkart" else self.fetcher._amazon_listing
+        fetched = self.fetcher._fetch_page(
+            store, page_url(seed, page), headers,
+            lambda soup, blocked: None if blocked else listing(soup, limit=CRAWL_PAGE_SIZE),
+        )
+        if fetched is None or fetched[1]:
+            # Fail the page rather than read "no products" as the end of the listing
+            raise RuntimeError("blocked by the store")
+        keys = []
+        new = 0
+        for item in fetched[0]:
+            key = product_key(item["url"])
+            if key:
+                keys.append(key)
+                new += self.index.upsert(key, store, item)
+        return keys, new
+
+    def run(self) -> dict:
+        stats = {"pages": 0, "products": 0, "new": 0, "failed": 0}
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="crawl") as pool:
+            pending = {}
+            while self.frontier or pending:
+                while self.frontier and len(pending) < self.concurrency:
+                    seed, page = self.frontier.pop(0)
+                    pending[pool.submit(self._crawl_page, seed, page)] = [seed, page]
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    seed, page = pending.pop(fut)
+                    try:
+                        keys, new = fut.result()
+                    except Exception as e:
+                        print(f"Crawl error on {page_url(seed, page)}: {e}", file=sys.stderr)
+                        stats["failed"] += 1
+                        # Left unvisited, so a rerun retries it
+                        failed.append([seed, page])
+                        continue
+                    self.visited.add(page_url(seed, page))
+                    unseen = set(keys) - self.seen
+                    self.seen.update(keys)
+                    stats["pages"] += 1
+                    stats["products"] += len(keys)
+                    stats["new"] += new
+                    if unseen and page < self.max_pages:
+                        self.frontier.append([seed, page + 1])
+                self._save(list(pending.values()) + failed)
+        if failed:
+            self.frontier = failed
+            self._save([])
+        elif os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python price_crawler.py", description="Crawl store listings into the product index")
+    parser.add_argument("seeds", nargs="*", help="Flipkart/Amazon category or search listing URLs")
+    parser.add_argument("-q", "--query", action="append", default=[], help="Also crawl both stores' search results for a query")
+    parser.add_argument("--index", default=PRODUCT_INDEX_PATH or "products.db", help="SQLite product index to fill")
+    parser.add_argument("--state", default=CRAWL_STATE_PATH, help="Checkpoint file used to resume an interrupted crawl")
+    parser.add_argument("-c", "--concurrency", type=int, default=2, help="Pages fetched at once")
+    parser.add_argument("--max-pages", type=int, default=CRAWL_MAX_PAGES, help="Pages per seed")
+    parser.add_argument("--rate", type=float, default=STORE_RATE_LIMIT, help="Requests/second per store host and exit IP")
+    args = parser.parse_args(argv)
+
+    seeds = list(args.seeds)
+    for q in args.query:
+        seeds.append(f"https://www.flipkart.com/search?q={quote_plus(q)}")
+        seeds.append(f"https://www.amazon.in/s?k={quote_plus(q)}")
+
+    fetcher = PriceFetcher()
+    fetcher.rate_limiter = HostRateLimiter(rate=args.rate)
+    fetcher.wait_for_rate_limit = True
+    crawler = Crawler(fetcher, ProductIndex(args.index), args.state, args.concurrency, args.max_pages)
+    try:
+        for seed in seeds:
+            crawler.add_seed(seed)
+    except ValueError as e:
+        parser.error(str(e))
+    if not crawler.frontier:
+        parser.error("nothing to crawl: give seed URLs or --query (or a --state with pages left)")
+
+    stats = crawler.run()
+    print(
+        f"Crawled {stats['pages']} page(s): {stats['products']} products, {stats['new']} new, "
+        f"{stats['failed']} failed page(s); index now holds {crawler.index.count()}",
+        file=sys.stderr,
+    )
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
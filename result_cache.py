@@ -0,0 +1,388 @@
+import gzip
+import heapq
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# How long a scraped result is served before we scrape again
+CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", "900"))
+CACHE_MAX_ENTRIES = int(os.getenv("PRICE_CACHE_MAX_ENTRIES", "2000"))
+# Trigram similarity (0-1) above which a recent query answers a new one
+FUZZY_MATCH_THRESHOLD = float(os.getenv("FUZZY_MATCH_THRESHOLD", "0.8"))
+
+# Popularity of a query halves over this many seconds without new searches
+QUERY_HALF_LIFE = float(os.getenv("QUERY_HALF_LIFE", "3600"))
+QUERY_TRACKER_MAX = int(os.getenv("QUERY_TRACKER_MAX", "5000"))
+
+# Whole-phrase fixes applied after lower-casing and whitespace cleanup
+QUERY_SPELLINGS = {
+    "i phone": "iphone",
+    "iphon": "iphone",
+    "ipone": "iphone",
+    "samsumg": "samsung",
+    "samsng": "samsung",
+    "one plus": "oneplus",
+    "oneplu": "oneplus",
+    "red mi": "redmi",
+    "moblie": "mobile",
+    "mobil": "mobile",
+    "labtop": "laptop",
+    "leptop": "laptop",
+    "ear phones": "earphones",
+    "head phones": "headphones",
+    "ear buds": "earbuds",
+    "smart watch": "smartwatch",
+}
+UNIT_ALIASES = {
+    "gb": "gb", "gigabyte": "gb", "gigabytes": "gb",
+    "tb": "tb", "terabyte": "tb",
+    "mb": "mb",
+    "mah": "mah",
+    "inch": "inch", "inches": "inch",
+    "hz": "hz",
+    "kg": "kg",
+    "l": "l", "ltr": "l", "litre": "l", "liter": "l",
+}
+
+_SPELLING_RE = re.compile(r"\b(" + "|".join(re.escape(k) for k in sorted(QUERY_SPELLINGS, key=len, reverse=True)) + r")\b")
+_UNIT_RE = re.compile(r"\b(\d+(?:\.\d+)?) ?(" + "|".join(sorted(UNIT_ALIASES, key=len, reverse=True)) + r")\b")
+
+
+def normalize_query(query: str) -> str:
+    """Canonical spelling of a search: 'I phone13 128 GB' -> 'iphone 13 128gb'"""
+    # Quoted phrases ("iphone 13") lose their quotes; a quote left straight after
+    # a number is inches (6.1"); any other quote is punctuation
+    q = re.sub(r'(?<![\d"])"([^"]+)"', r" \1 ", query.lower())
+    q = re.sub(r'(\d)\s?"', r"\1 inch ", q).replace('"', " ")
+    # Keep '+' and '.' (s23+, 6.1 inch); everything else is a separator
+    q = re.sub(r"[^\w+.]+", " ", q).replace("_", " ")
+    # Glue long words and numbers apart (iphone13 -> iphone 13) but keep model codes like s23/rtx4090
+    q = re.sub(r"\b([a-z]{4,})(\d)", r"\1 \2", q)
+    q = re.sub(r"(\d)([a-z]{2,})\b", r"\1 \2", q)
+    q = " ".join(q.split())
+    q = _SPELLING_RE.sub(lambda m: QUERY_SPELLINGS[m.group(1)], q)
+    q = _UNIT_RE.sub(lambda m: m.group(1) + UNIT_ALIASES[m.group(2)], q)
+    return q.strip(" .")
+
+
+def query_key(normalized: str) -> str:
+    """Order-insensitive cache key for a normalized query"""
+    return " ".join(sorted(normalized.split()))
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _numeric_tokens(key: str) -> frozenset:
+    return frozenset(t for t in key.split() if any(ch.isdigit() for ch in t))
+
+
+def _typo_budget(token: str) -> int:
+    """Edits a word may differ by and still be the same word mistyped"""
+    if len(token) < 5 or any(ch.isdigit() for ch in token):
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance counting adjacent swaps as one edit; anything over limit returns limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev2, prev = prev, row
+    return min(prev[-1], limit + 1)
+
+
+def _typo_of(key: str, other: str) -> bool:
+    """True if two keys name the same words, allowing only small typos in longer words.
+
+    An extra or missing word ('pro', 'se', 'lite') is never a typo.
+    """
+    a, b = key.split(), other.split()
+    if len(a) != len(b):
+        return False
+    left = list(b)
+    unmatched = []
+    for token in a:
+        if token in left:
+            left.remove(token)
+        else:
+            unmatched.append(token)
+    # Pair the remaining words cheapest first; every word needs a partner within its budget
+    pairs = sorted(
+        (_edit_distance(x, y, _typo_budget(x)), i, j)
+        for i, x in enumerate(unmatched) for j, y in enumerate(left)
+    )
+    used_a, used_b = set(), set()
+    for dist, i, j in pairs:
+        if i in used_a or j in used_b:
+            continue
+        if dist > min(_typo_budget(unmatched[i]), _typo_budget(left[j])):
+            continue
+        used_a.add(i)
+        used_b.add(j)
+    return len(used_a) == len(unmatched)
+
+
+class FuzzyIndex:
+    """Trigram index over recently answered query keys.
+
+    Keys only match when their numeric tokens (model numbers, storage) are
+    identical, so 'iphone 13' never answers 'iphone 14', and when every word
+    pairs up with one at most a typo away, so 'apple watch' never answers
+    'apple watch se'.
+    """
+
+    def __init__(self, threshold: float = FUZZY_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._grams = {}  # key -> trigram set
+        self._postings = {}  # trigram -> set of keys
+
+    def add(self, key: str):
+        if key in self._grams:
+            return
+        grams = _trigrams(key)
+        self._grams[key] = grams
+        for g in grams:
+            self._postings.setdefault(g, set()).add(key)
+
+    def remove(self, key: str):
+        for g in self._grams.pop(key, ()):
+            keys = self._postings.get(g)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[g]
+
+    def similar(self, key: str) -> list:
+        """Indexed keys at or above the threshold, most similar first"""
+        grams = _trigrams(key)
+        overlap = {}
+        for g in grams:
+            for other in self._postings.get(g, ()):
+                overlap[other] = overlap.get(other, 0) + 1
+        numbers = _numeric_tokens(key)
+        matches = []
+        for other, shared in overlap.items():
+            if other == key or _numeric_tokens(other) != numbers:
+                continue
+            score = shared / (len(grams) + len(self._grams[other]) - shared)
+            if score >= self.threshold and _typo_of(key, other):
+                matches.append((score, other))
+        matches.sort(reverse=True)
+        return [other for _, other in matches]
+
+
+class ResultCache:
+    """Per-store TTL cache of search results keyed by query_key(), LRU-bounded.
+
+    Lookups fall back to the most similar fresh key from the FuzzyIndex.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES,
+                 threshold: float = FUZZY_MATCH_THRESHOLD, fuzzy: bool = True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Exact-key caches (e.g. by URL) skip the trigram index entirely
+        self.index = FuzzyIndex(threshold) if fuzzy else None
+        self._entries = OrderedDict()  # (store, key) -> (stored_at, result)
+        self._key_refs = {}  # key -> number of stores holding it
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def _fresh(self, store: str, key: str, now: float):
+        entry = self._entries.get((store, key))
+        if entry and now - entry[0] < self.ttl:
+            self._entries.move_to_end((store, key))
+            return entry[1]
+        return None
+
+    def get(self, store: str, key: str, fuzzy: bool = True):
+        now = time.time()
+        with self._lock:
+            result = self._fresh(store, key, now)
+            if result is not None:
+                self.hits += 1
+                return result
+            if fuzzy and self.index is not None:
+                for other in self.index.similar(key):
+                    result = self._fresh(store, other, now)
+                    if result is not None:
+                        self.fuzzy_hits += 1
+                        return result
+            self.misses += 1
+            return None
+
+    def expires_in(self, store: str, key: str) -> float | None:
+        """Seconds until an exact entry goes stale (negative once stale), None if absent"""
+        with self._lock:
+            entry = self._entries.get((store, key))
+        return None if entry is None else entry[0] + self.ttl - time.time()
+
+    def put(self, store: str, key: str, result: dict, stored_at: float | None = None):
+        with self._lock:
+            existing = self._entries.get((store, key))
+            if existing and stored_at and existing[0] >= stored_at:
+                # Never let an older copy (e.g. from a snapshot) replace a newer result
+                return
+            if existing is None:
+                self._key_refs[key] = self._key_refs.get(key, 0) + 1
+                if self.index is not None:
+                    self.index.add(key)
+            self._entries[(store, key)] = (stored_at or time.time(), result)
+            self._entries.move_to_end((store, key))
+            while len(self._entries) > self.max_entries:
+                (_, old_key), _ = self._entries.popitem(last=False)
+                self._key_refs[old_key] -= 1
+                if not self._key_refs[old_key]:
+                    del self._key_refs[old_key]
+                    if self.index is not None:
+                        self.index.remove(old_key)
+
+    def save_snapshot(self, path: str) -> int:
+        """Write fresh entries to a gzipped JSON-lines file (atomically); returns entries written"""
+        now = time.time()
+        with self._lock:
+            entries = [(k, v) for k, v in self._entries.items() if now - v[0] < self.ttl]
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=5) as f:
+            # Oldest first, so loading rebuilds the same LRU order
+            for (store, key), (stored_at, result) in entries:
+                f.write(json.dumps([store, key, stored_at, result], ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(tmp, path)
+        return len(entries)
+
+    def load_snapshot(self, path: str) -> int:
+        """Merge a snapshot into the cache, skipping expired entries; returns entries loaded"""
+        now = time.time()
+        loaded = 0
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        store, key, stored_at, result = json.loads(line)
+                    except ValueError:
+                        continue
+                    if now - stored_at < self.ttl:
+                        self.put(store, key, result, stored_at=stored_at)
+                        loaded += 1
+        except FileNotFoundError:
+            return 0
+        except (OSError, EOFError) as e:
+            print(f"Warning: Could not read cache snapshot {path}: {e}")
+        return loaded
+
+
+class QueryTracker:
+    """Exponentially decayed search counts per (store, query key)"""
+
+    def __init__(self, half_life: float = QUERY_HALF_LIFE, max_entries: int = QUERY_TRACKER_MAX):
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self._counts = {}  # (store, key) -> [score, updated_at, normalized query]
+        self._lock = threading.Lock()
+
+    def _decayed(self, entry: list, now: float) -> float:
+        return entry[0] * 0.5 ** ((now - entry[1]) / self.half_life)
+
+    def record(self, store: str, key: str, normalized: str):
+        now = time.time()
+        with self._lock:
+            entry = self._counts.get((store, key))
+            if entry:
+                entry[0] = self._decayed(entry, now) + 1.0
+                entry[1] = now
+            else:
+                self._counts[(store, key)] = [1.0, now, normalized]
+                if len(self._counts) > self.max_entries:
+                    self._prune(now)
+
+    def _prune(self, now: float):
+        # Drop the least popular half rather than pruning one entry per insert
+        ranked = sorted(self._counts, key=lambda k: self._decayed(self._counts[k], now))
+        for k in ranked[:len(ranked) // 2]:
+            del self._counts[k]
+
+    def top(self, store: str, k: int, min_score: float = 0.0) -> list:
+        """The k most popular (normalized query, key) pairs for a store scoring at least min_score"""
+        now = time.time()
+        with self._lock:
+            scored = [
+                (score, entry[2], key)
+                for (s, key), entry in self._counts.items() if s == store
+                for score in (self._decayed(entry, now),) if score >= min_score
+            ]
+        return [(normalized, key) for _, normalized, key in heapq.nlargest(k, scored)]
+
+
+class ProductIndex:
+    """SQLite index of crawled products (see price_crawler.py), one row per product key.
+
+    lookup() answers a query from it only with products seen within max_age
+    seconds whose title is the query word for word (typos allowed as in the
+    fuzzy cache); a title with extra words is a different product.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS products ("
+                " key TEXT PRIMARY KEY, store TEXT NOT NULL, title TEXT NOT NULL, title_norm TEXT NOT NULL,"
+                " price TEXT, url TEXT NOT NULL, image_url TEXT, seen_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS products_store_seen ON products (store, seen_at)")
+
+    def upsert(self, key: str, store: str, item: dict) -> bool:
+        """Store a crawled product card; returns True if the product is new to the index"""
+        with self._lock, self._db:
+            new = self._db.execute("SELECT 1 FROM products WHERE key = ?", (key,)).fetchone() is None
+            self._db.execute(
+                "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, store, item["product_name"], f" {normalize_query(item['product_name'])} ",
+                 item.get("price"), item["url"], item.get("image_url"), time.time()),
+            )
+        return new
+
+    def lookup(self, store: str, normalized: str, max_age: float, limit: int = 5, scan: int = 200) -> list:
+        """Fresh products titled exactly as the query, shortest titles first; [] when there are none"""
+        tokens = normalized.split()
+        if not tokens:
+            return []
+        # SQL narrows to titles holding every query word; the word-for-word check is done here
+        where = " AND ".join("title_norm LIKE ?" for _ in tokens)
+        params = [store, time.time() - max_age] + [f"% {t} %" for t in tokens] + [scan]
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT title, title_norm, price, url, image_url FROM products"
+                f" WHERE store = ? AND seen_at >= ? AND {where} ORDER BY length(title), seen_at DESC LIMIT ?",
+                params,
+            ).fetchall()
+        key = query_key(normalized)
+        return [
+            {"product_name": t, "price": p, "url": u, "image_url": i}
+            for t, norm, p, u, i in rows if _typo_of(key, query_key(norm))
+        ][:limit]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM products").fetchone()[0]
@@ -0,0 +1,127 @@
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Fraction of live searches profiled (0 disables sampling; /profile still works)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # seconds between stack samples
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))  # newest profile files kept on disk
+
+
+class _Session:
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.time()
+        self.stacks = {}  # "root;...;leaf" -> samples
+        self.samples = 0
+        self.stop = threading.Event()
+        self.thread = None
+
+
+class SearchProfiler:
+    """Sampling profiler for searches, writing collapsed stacks to disk.
+
+    While a session is open a daemon thread reads sys._current_frames()
+    every `interval` seconds and counts each thread's stack that passes
+    through `focus` (price_fetcher by default), down to the bs4/re/requests
+    leaves. Sampling is process-wide, so searches that overlap a profiled
+    one show up too. Overlapping sessions share one sampler. The last
+    stop() writes `<time>-<label>.folded` (flamegraph.pl / speedscope
+    format) and keeps the newest `keep` files. No thread runs between
+    sessions.
+    """
+
+    def __init__(self, sample_rate: float = PROFILE_SAMPLE_RATE, interval: float = PROFILE_INTERVAL,
+                 out_dir: str = PROFILE_DIR, keep: int = PROFILE_KEEP, focus: str = "price_fetcher.py"):
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.out_dir = out_dir
+        self.keep = keep
+        self.focus = focus
+        self._session = None
+        self._users = 0
+        self._lock = threading.Lock()
+
+    def maybe(self, label: str):
+        """Context manager profiling this search with probability sample_rate"""
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return self.profile(label)
+        return nullcontext()
+
+    @contextmanager
+    def profile(self, label: str):
+        self.start(label)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def start(self, label: str):
+        with self._lock:
+            self._users += 1
+            if self._session is not None:
+                return
+            session = self._session = _Session(label)
+        session.thread = threading.Thread(target=self._sample, args=(session,), name="profiler", daemon=True)
+        session.thread.start()
+
+    def stop(self) -> dict | None:
+        """End one start(); the call that closes the session writes it and returns a summary"""
+        with self._lock:
+            self._users -= 1
+            if self._users > 0 or self._session is None:
+                return None
+            session, self._session = self._session, None
+        session.stop.set()
+        session.thread.join()
+        path = self._write(session) if session.stacks else None
+        leaves = {}
+        for stack, n in session.stacks.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + n
+        return {
+            "path": path,
+            "samples": session.samples,
+            "seconds": round(time.time() - session.started, 1),
+            "top": sorted(leaves.items(), key=lambda kv: -kv[1])[:8],
+        }
+
+    def _sample(self, session: _Session):
+        me = threading.get_ident()
+        while not session.stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                names = []
+                focused = False
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_qualname}")
+                    focused = focused or code.co_filename.endswith(self.focus)
+                    frame = frame.f_back
+                if focused:
+                    stack = ";".join(reversed(names))
+                    session.stacks[stack] = session.stacks.get(stack, 0) + 1
+            session.samples += 1
+
+    def _write(self, session: _Session) -> str:
+        os.makedirs(self.out_dir, exist_ok=True)
+        label = re.sub(r"[^\w-]+", "-", session.label).strip("-")[:40] or "search"
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(session.started)) + f".{int(session.started % 1 * 1000):03d}"
+        path = os.path.join(self.out_dir, f"{stamp}-{label}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in sorted(session.stacks.items()):
+                f.write(f"{stack} {n}\n")
+        # Timestamped names sort oldest first
+        files = sorted(name for name in os.listdir(self.out_dir) if name.endswith(".folded") and name[:1].isdigit())
+        for name in files[:max(0, len(files) - self.keep)]:
+            try:
+                os.remove(os.path.join(self.out_dir, name))
+            except OSError:
+                pass
+        return path
@@ -0,0 +1,52 @@
+import pytest
+
+
+class StubResponse:
+    """The parts of a streamed requests.Response that _fetch_page reads"""
+
+    encoding = "utf-8"
+
+    def __init__(self, body: bytes | str):
+        self.body = body.encode() if isinstance(body, str) else body
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class StubSession:
+    """Answers every GET with pages(url), or pages itself when it isn't callable.
+
+    A returned exception is raised instead. Requests are recorded in calls
+    as (url, kwargs).
+    """
+
+    def __init__(self, pages):
+        self.pages = pages if callable(pages) else (lambda url: pages)
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append((url, kwargs))
+        page = self.pages(url)
+        if isinstance(page, Exception):
+            raise page
+        return StubResponse(page)
+
+
+@pytest.fixture
+def stub_fetcher(monkeypatch):
+    """Factory for a PriceFetcher whose session serves stub pages (retry sleeps skipped)"""
+    pytest.importorskip("bs4")
+    import price_fetcher
+
+    monkeypatch.setattr(price_fetcher.time, "sleep", lambda seconds: None)
+
+    def make(pages):
+        fetcher = price_fetcher.PriceFetcher()
+        fetcher.session = StubSession(pages)
+        return fetcher
+
+    return make
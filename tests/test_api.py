@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("bs4")
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+from price_api import create_app  # noqa: E402
+
+
+class FakeFetcher:
+    def __init__(self):
+        self.searched = []
+
+    def search(self, store, query):
+        self.searched.append(query)
+        return {"store": store, "product_name": query, "price": "₹1"}
+
+
+def post_batch(payload):
+    fetcher = FakeFetcher()
+
+    async def run():
+        async with TestClient(TestServer(create_app(fetcher))) as client:
+            resp = await client.post("/search/batch", data=json.dumps(payload))
+            return resp.status, await resp.text()
+
+    status, text = asyncio.run(run())
+    return status, text, fetcher.searched
+
+
+@pytest.mark.parametrize("payload", [
+    {"queries": "iphone"},
+    {"queries": ["iphone", None]},
+    {"queries": ["iphone", 13]},
+    {"queries": {"q": "iphone"}},
+    {},
+    ["iphone"],
+])
+def test_batch_rejects_malformed_queries(payload):
+    status, _, searched = post_batch(payload)
+    assert status == 400
+    assert searched == []
+
+
+def test_batch_streams_one_row_per_query():
+    status, text, searched = post_batch({"queries": ["iphone 13", "  ", "kindle"]})
+    assert status == 200
+    assert sorted(json.loads(line)["query"] for line in text.splitlines()) == ["iphone 13", "kindle"]
+    assert sorted(set(searched)) == ["iphone 13", "kindle"]
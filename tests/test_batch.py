@@ -0,0 +1,50 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+import requests  # noqa: E402
+
+from price_fetcher import run_batch  # noqa: E402
+
+FOUND = (
+    '<div class="s-main-slot"><div data-component-type="s-search-result" data-asin="B0TEST0001">'
+    '<h2><a><span>Apple iPhone 13 128 GB</span></a></h2>'
+    '<span class="a-price"><span class="a-offscreen">₹52,999</span></span></div></div>'
+)
+NOT_FOUND = '<div class="s-main-slot"><div class="s-no-outline">No results for your search.</div></div>'
+BLOCKED = "<html><body><h4>Enter the characters you see below</h4> Robot Check</body></html>"
+
+
+def page_for(url: str):
+    """A page per query keyword; 'down' is a connection error"""
+    if "down" in url:
+        return requests.exceptions.ConnectionError("connection refused")
+    if "robot" in url:
+        return BLOCKED
+    return FOUND if "iphone" in url else NOT_FOUND
+
+
+@pytest.fixture
+def fetcher(stub_fetcher):
+    return stub_fetcher(page_for)
+
+
+def test_errors_and_blocks_fail_and_stay_out_of_the_checkpoint(fetcher, tmp_path):
+    checkpoint = tmp_path / "done.txt"
+    out = io.StringIO()
+    stats = run_batch(fetcher, ["iphone 13", "unobtainium", "robot vacuum", "down detector"], out,
+                      ["amazon"], concurrency=2, checkpoint=str(checkpoint))
+
+    rows = {row["query"]: row for row in map(json.loads, out.getvalue().splitlines())}
+    assert rows["iphone 13"]["results"][0]["price"] == "₹52,999"
+    assert rows["unobtainium"]["results"] == [] and "error" not in rows["unobtainium"]
+    assert "error" in rows["robot vacuum"]
+    assert "error" in rows["down detector"]
+    assert (stats["priced"], stats["failed"]) == (2, 2)
+    assert set(checkpoint.read_text().split("\n")) - {""} == {"13 iphone", "unobtainium"}
+
+
+def test_non_strict_search_still_returns_none(fetcher):
+    assert fetcher.search("amazon", "robot vacuum") is None
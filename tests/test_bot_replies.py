@@ -0,0 +1,54 @@
+import asyncio
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("telegram")
+import price_bot  # noqa: E402
+from price_bot import PriceBot  # noqa: E402
+
+ROWS = [
+    ("Flipkart", {"product_name": "Apple iPhone 13", "price": "₹52,999", "image_url": "https://img/f.jpg"}, "https://fk"),
+    ("Amazon", {"product_name": "Apple iPhone 13", "price": "₹53,499", "image_url": "https://img/a.jpg"}, "https://amz"),
+]
+
+
+def bot_replying(photos_ok: bool):
+    bot = PriceBot.__new__(PriceBot)
+    bot._result_refs = OrderedDict()
+    sent = {"texts": [], "captions": []}
+
+    async def lookup(product_name, partial=None):
+        return ROWS
+
+    async def reply_with_photos(update, caption, images, keyboard=None):
+        sent["captions"].append(caption)
+        return photos_ok
+
+    async def reply(update, make_call, priority=0):
+        return await make_call()
+
+    async def reply_text(text, **kwargs):
+        sent["texts"].append(text)
+
+    bot.lookup = lookup
+    bot.reply_with_photos = reply_with_photos
+    bot.reply = reply
+    update = SimpleNamespace(message=SimpleNamespace(reply_text=reply_text))
+    asyncio.run(bot.answer_search(update, {"product_name": "iphone 13", "partial": {}}))
+    return sent
+
+
+def test_photo_mode_text_fallback_keeps_image_links(monkeypatch):
+    monkeypatch.setattr(price_bot, "REPLY_MODE", "photo")
+    sent = bot_replying(photos_ok=False)
+    assert "[Image]" not in sent["captions"][0]
+    assert sent["texts"][0].count("[Image](") == 2
+
+
+def test_photo_mode_caption_has_no_image_links(monkeypatch):
+    monkeypatch.setattr(price_bot, "REPLY_MODE", "photo")
+    sent = bot_replying(photos_ok=True)
+    assert sent["texts"] == []
+    assert "[Image]" not in sent["captions"][0]
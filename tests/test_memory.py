@@ -0,0 +1,86 @@
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("bs4")
+from conftest import StubResponse  # noqa: E402
+from price_fetcher import MAX_BODY_BYTES, build_headers, read_capped  # noqa: E402
+
+# Peak Python allocation per character of HTML while fetching and parsing a
+# results page: the parse tree costs ~25x the markup (~35x on the first parse,
+# which also compiles the selectors)
+PEAK_PER_HTML_CHAR = 40
+# A page that is mostly one <script> blob should cost little more than the blob
+PEAK_PER_PADDED_CHAR = 1.5
+
+
+def amazon_page(cards: int = 60, padding: int = 0) -> bytes:
+    results = "".join(
+        f'<div data-component-type="s-search-result" data-asin="B0TEST{i:04d}">'
+        f'<img class="s-image" src="https://m.media-amazon.com/images/I/{i}.jpg">'
+        f'<h2><a href="/dp/B0TEST{i:04d}"><span>Apple iPhone 13 ({i}) 128 GB</span></a></h2>'
+        f'<span class="a-price"><span class="a-offscreen">₹{50000 + i:,}</span></span></div>'
+        for i in range(cards)
+    )
+    html = f'<html><body><div class="s-main-slot">{results}</div><script>{"x" * padding}</script></body></html>'
+    return html.encode()
+
+
+def flipkart_page(cards: int = 40) -> bytes:
+    results = "".join(
+        f'<div data-id="MOBTEST{i:04d}"><a href="/apple-iphone-13/p/itm{i:04d}?pid=MOBTEST{i:04d}">'
+        f'<img src="https://rukminim2.flixcart.com/image/{i}.jpeg"><div class="KzDlHZ">Apple iPhone 13 ({i}) 128 GB</div>'
+        f'<div class="Nx9bqj">₹{50000 + i:,}</div></a></div>'
+        for i in range(cards)
+    )
+    return f"<html><body>{results}<nav>1 2 3</nav></body></html>".encode()
+
+
+@pytest.fixture
+def traced():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def fetch(make_fetcher, store: str, body: bytes):
+    fetcher = make_fetcher(body)
+    pages = []
+    fetcher.memory_hook = lambda store, url, stats: pages.append(stats)
+    extract = fetcher._extract_flipkart if store == "flipkart" else fetcher._extract_amazon
+    url = "https://www.flipkart.com/search?q=iphone" if store == "flipkart" else "https://www.amazon.in/s?k=iphone"
+    found, blocked, _ = fetcher._fetch_page(store, url, build_headers(), lambda soup, blocked: extract(soup, record=False))
+    return found, pages[0]
+
+
+@pytest.mark.parametrize("store, body", [
+    ("amazon", amazon_page()),
+    ("amazon", amazon_page(cards=10)),
+    ("flipkart", flipkart_page()),
+])
+def test_page_peak_stays_under_budget(traced, stub_fetcher, store, body):
+    found, stats = fetch(stub_fetcher, store, body)
+    assert found["title"] and found["price"]
+    assert 0 < stats["peak_bytes"] < PEAK_PER_HTML_CHAR * stats["html_chars"]
+
+
+def test_oversized_body_is_truncated(traced, stub_fetcher):
+    body = amazon_page(padding=MAX_BODY_BYTES + 512 * 1024)
+    assert len(body) > MAX_BODY_BYTES
+    found, stats = fetch(stub_fetcher, "amazon", body)
+    # Results come before the cut-off, so they still parse
+    assert found["title"] == "Apple iPhone 13 (0) 128 GB"
+    assert stats["html_chars"] <= MAX_BODY_BYTES
+    assert stats["peak_bytes"] < PEAK_PER_PADDED_CHAR * stats["html_chars"]
+
+
+def test_read_capped_copies_the_body_once(traced):
+    # A cap that falls mid-chunk, so the last chunk has to be cut
+    cap = MAX_BODY_BYTES - 1000
+    resp = StubResponse(b"x" * (MAX_BODY_BYTES + 512 * 1024))
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    body = read_capped(resp, cap)
+    assert len(body) == cap
+    # The chunks plus the joined body; trimming after the join would make it 3x
+    assert tracemalloc.get_traced_memory()[1] - before < 2.2 * cap
@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+import price_fetcher  # noqa: E402
+from price_fetcher import PriceFetcher  # noqa: E402
+
+
+@pytest.fixture
+def fetcher():
+    f = PriceFetcher()
+    f.scraped = []
+
+    def scrape(query):
+        f.scraped.append(query)
+        return {"product_name": query, "price": "₹1"}
+
+    f._scrapers = {"flipkart": scrape, "amazon": scrape}
+    return f
+
+
+def searched(f, query, times, age):
+    """Search `times` times, then backdate the cached result by `age` seconds"""
+    for _ in range(times):
+        f.search("amazon", query)
+    normalized, key = f._normalize(query)
+    f.cache._entries[("amazon", key)] = (time.time() - age, {"product_name": normalized})
+    f.scraped.clear()
+
+
+def test_refreshes_popular_queries_about_to_expire(fetcher):
+    searched(fetcher, "iphone 13", times=3, age=fetcher.cache.ttl - 30)
+    assert fetcher.prefetch_once() == 1
+    assert fetcher.scraped == ["iphone 13"]
+
+
+def test_skips_queries_that_already_expired(fetcher):
+    searched(fetcher, "iphone 13", times=3, age=fetcher.cache.ttl + 30)
+    assert fetcher.prefetch_once() == 0
+
+
+def test_skips_queries_below_the_popularity_floor(fetcher):
+    assert price_fetcher.PREFETCH_MIN_SCORE > 1
+    searched(fetcher, "kindle", times=1, age=fetcher.cache.ttl - 30)
+    assert fetcher.prefetch_once() == 0
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+pytest.importorskip("requests")
+from price_fetcher import STORE_RATE_LIMIT, HostRateLimiter, ProxyPool, build_headers  # noqa: E402
+
+# Stand-in exits; the stub session records the proxy of every request instead of connecting
+PROXIES = ["http://10.0.0.2:3128", "http://10.0.0.3:3128", "http://10.0.0.4:3128"]
+HOST = "www.amazon.in"
+
+
+@pytest.fixture
+def proxied(stub_fetcher):
+    random.seed(7)
+    fetcher = stub_fetcher("<html><body></body></html>")
+    fetcher.proxy_pool = ProxyPool(PROXIES)
+    return fetcher
+
+
+def fetch(fetcher, query: str):
+    fetcher._fetch_page("amazon", f"https://{HOST}/s?k={query}", build_headers(), lambda soup, blocked: None)
+    proxies = fetcher.session.calls[-1][1]["proxies"]
+    return proxies["https"] if proxies else None
+
+
+def test_queries_spread_over_exits_and_keep_theirs(proxied):
+    used = {q: fetch(proxied, q) for q in (f"phone{i}" for i in range(30))}
+    assert set(used.values()) == set(PROXIES)
+    assert all(fetch(proxied, q) == proxy for q, proxy in used.items())
+
+
+def test_each_exit_is_limited_at_the_base_rate(proxied):
+    assert proxied.rate_limiter.rate == STORE_RATE_LIMIT
+    for i in range(30):
+        fetch(proxied, f"phone{i}")
+    sent = {}
+    for _, kwargs in proxied.session.calls:
+        sent[kwargs["proxies"]["https"]] = sent.get(kwargs["proxies"]["https"], 0) + 1
+    # Every exit's bucket was charged for its own requests only
+    for proxy, n in sent.items():
+        tokens = proxied.rate_limiter._buckets[(HOST, proxy)][0]
+        assert proxied.rate_limiter.burst - n <= tokens < proxied.rate_limiter.burst - n + 1
+
+
+def test_direct_fallback_gets_one_exits_rate(proxied):
+    for proxy in PROXIES:
+        for _ in range(3):
+            proxied.proxy_pool.report(proxy, 1.0, failed=True)
+    assert proxied.exits() == [None]
+    assert fetch(proxied, "phone") is None
+    assert list(proxied.rate_limiter._buckets) == [(HOST, None)]
+
+
+def test_exits_do_not_share_tokens():
+    limiter = HostRateLimiter(rate=0.001, burst=2)
+    limiter.record(HOST, PROXIES[0])
+    limiter.record(HOST, PROXIES[0])
+    assert not limiter.available(HOST, PROXIES[0])
+    assert limiter.available(HOST, PROXIES[1])
+    assert limiter.available(HOST)
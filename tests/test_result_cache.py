@@ -0,0 +1,70 @@
+import pytest
+
+from result_cache import ProductIndex, ResultCache, normalize_query, query_key
+
+
+def cached(*queries):
+    cache = ResultCache(ttl=60)
+    for q in queries:
+        cache.put("amazon", query_key(normalize_query(q)), {"product_name": q})
+    return cache
+
+
+def lookup(cache, query):
+    result = cache.get("amazon", query_key(normalize_query(query)))
+    return result and result["product_name"]
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("boat airdopes 141", "boat airdopes 141 pro"),
+    ("boat airdopes 141 pro", "boat airdopes 141"),
+    ("apple watch", "apple watch se"),
+    ("apple watch se", "apple watch"),
+    ("samsung galaxy s23", "samsung galaxy s23 ultra"),
+    ("redmi note 13", "redmi note 13 pro max"),
+    ("oneplus nord ce 3", "oneplus nord ce 3 lite"),
+    ("iphone 15 pro", "iphone 15 plus"),
+    ("iphone 13", "iphone 14"),
+])
+def test_variants_never_share_results(stored, asked):
+    assert lookup(cached(stored), asked) is None
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("boat airdopes 141 earbuds", "boat airdops 141 earbuds"),
+    ("logitech wireless mouse", "logitech wireles mouse"),
+    ("sony headphones wh1000xm5", "sony headphnes wh1000xm5"),
+])
+def test_typos_still_hit(stored, asked):
+    assert lookup(cached(stored), asked) == stored
+
+
+def test_word_order_and_spacing_hit_exactly():
+    cache = cached("iPhone 13 128 GB")
+    assert lookup(cache, "128gb i phone13") == "iPhone 13 128 GB"
+    assert cache.hits == 1
+
+
+@pytest.mark.parametrize("query, normalized", [
+    ('"iphone 13"', "iphone 13"),
+    ('buy "galaxy s23" 256 GB', "buy galaxy s23 256gb"),
+    ('samsung tv 55"', "samsung tv 55inch"),
+    ('6.1" phone case', "6.1inch phone case"),
+    ('32" to 55" tv', "32inch to 55inch tv"),
+])
+def test_quotes_are_only_inches_after_a_number(query, normalized):
+    assert normalize_query(query) == normalized
+
+
+def test_product_index_only_answers_word_for_word_titles(tmp_path):
+    index = ProductIndex(str(tmp_path / "products.db"))
+    for n, title in enumerate(["iPhone 13 Case", "Apple iPhone 13 Pro", "Apple iPhone 13", "Apple iPhone 13 (128 GB)"]):
+        index.upsert(f"k{n}", "amazon", {"product_name": title, "price": "₹1", "url": f"https://amz/{n}"})
+
+    def titles(query):
+        return [m["product_name"] for m in index.lookup("amazon", normalize_query(query), max_age=60)]
+
+    assert titles("iphone 13") == []
+    assert titles("apple iphone 13") == ["Apple iPhone 13"]
+    assert titles("iphone 13 apple") == ["Apple iPhone 13"]
+    assert titles("apple iphone 13 128gb") == ["Apple iPhone 13 (128 GB)"]
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("telegram")
+import price_bot  # noqa: E402
+from price_bot import SendQueue  # noqa: E402
+
+
+def test_join_waits_for_calls_parked_by_the_chat_limit():
+    async def run():
+        queue = SendQueue(global_rate=100, chat_rate=5, chat_burst=1)
+        queue.start()
+        sent = []
+
+        def call(n):
+            async def make_call():
+                sent.append(n)
+            return make_call
+
+        # The second call for the chat is parked ~0.2s for a token
+        tasks = [asyncio.create_task(queue.send(1, call(n))) for n in range(2)]
+        await asyncio.sleep(0.05)
+        await queue.join(timeout=2.0)
+        done = list(sent)
+        await asyncio.gather(*tasks)
+        return done
+
+    assert asyncio.run(run()) == [0, 1]
+
+
+def test_idle_chat_buckets_are_dropped(monkeypatch):
+    monkeypatch.setattr(price_bot, "SEND_CHAT_SWEEP", 0.0)
+    queue = SendQueue(chat_rate=0.001, chat_burst=2)
+    queue._chat("quiet")
+    queue._chat("busy").take()
+    queue._chat("paused").pause(60)
+    queue._sweep()
+    assert set(queue._chats) == {"busy", "paused"}
@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip("telegram")
+from price_bot import PriceBot  # noqa: E402
+
+
+def test_bullets_and_numbering_are_stripped():
+    text = "1. iPhone 13\n2) boAt Airdopes 141\n- Kindle\n• Echo Dot; * Fire TV Stick"
+    assert PriceBot.parse_shopping_list(text) == [
+        "iPhone 13", "boAt Airdopes 141", "Kindle", "Echo Dot", "Fire TV Stick",
+    ]
+
+
+def test_leading_decimals_are_kept():
+    text = "3.5mm aux cable\n6.1 inch phone case\n2. 3.5mm aux cable"
+    assert PriceBot.parse_shopping_list(text) == ["3.5mm aux cable", "6.1 inch phone case"]
+
+
+def test_total_notes_items_without_a_price():
+    bot = PriceBot.__new__(PriceBot)
+    rows = {
+        0: [("Flipkart", {"price": "₹52,999"}, None), ("Amazon", {"price": "₹53,499"}, None)],
+        1: [("Flipkart", None, None), ("Amazon", None, None)],
+    }
+    text = bot.render_shopping_list(["iPhone 13", "Kindle"], rows)
+    assert "*Cheapest total*: ₹52,999 _(excl. 1 item without a price)_" in text
+    rows[1] = [("Flipkart", {"price": "₹9,999"}, None), ("Amazon", None, None)]
+    assert "*Cheapest total*: ₹62,998\n" in bot.render_shopping_list(["iPhone 13", "Kindle"], rows)
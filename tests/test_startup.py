@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("telegram")
+
+# Seconds from main.py start to a constructed PriceBot (imports + init)
+STARTUP_BUDGET = 2.0
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_startup_within_budget():
+    proc = subprocess.run(
+        [sys.executable, "main.py", "--startup-report", "--budget", str(STARTUP_BUDGET)],
+        cwd=ROOT, capture_output=True, text=True, timeout=60,
+    )
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    assert "total" in proc.stdout